@@ -9,12 +9,13 @@ from homeassistant.helpers import entity_registry as er, discovery
 
 from .const import DOMAIN, PLATFORMS
 from .services import async_register_services
+from .websocket_api import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """ Initializes the Compliance Manager component.
-        Sets up the standard reload service and, if TESTMODE is enabled,
+        Sets up the standard reload service, the websocket commands and, if TESTMODE is enabled,
         dynamically loads the switch platform for the lab environment.
         It also registers the 'cleanup_test_lab' service to purge lab-related
         entities from the Home Assistant registry
@@ -26,6 +27,7 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
     # 2. Register custom services (snooze, cleanup, ...)
     await async_register_services(hass)
+    async_register_websocket_commands(hass)
 
     test_mode = cmp_mgr_cfg.get("test_mode", False)
     # 3. Fix: Explicitly load/reload the switch platform if TESTMODE is on
@@ -1,10 +1,12 @@
 """Platform for sensor integration."""
 from __future__ import annotations
 
+import asyncio
+import fnmatch
 import logging
 import datetime
+import time
 from datetime import timedelta
-from typing import Any
 
 from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
 from homeassistant.components.binary_sensor import (
@@ -15,23 +17,33 @@ from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.util import dt as dt_util
 
 from .const import (
+    DEFAULT_EVALUATION_SLICE,
     DEFAULT_GRACE,
     DEFAULT_ICON,
     DEFAULT_SEVERITY,
     DOMAIN,
+    EVENT_VIOLATION_CLEARED,
+    EVENT_VIOLATION_SNOOZED,
+    EVENT_VIOLATION_STARTED,
     SEVERITY_LEVELS,
-    CONDITION_KEYS,
-    ON_EQUIVALENT_STATES,
+    SIGNAL_COMPLIANCE_DELTA,
+    SNOOZE_AREA_PREFIX,
+    SNOOZE_GLOB_PREFIX,
+    SNOOZE_LABEL_PREFIX,
     ComplianceManagerAttributes as ATTRIBUTES,
 )
+from .capture import EventCapture
+from .conditions import ConditionCompiler, iter_leaves
 from .schema import BINSENS_PLATFORM_SCHEMA as PLATFORM_SCHEMA
+from .staleness import async_get_staleness_sweep
+from .state_dispatcher import async_get_state_dispatcher
 from .timers import RegistryEntry
 
 _LOGGER = logging.getLogger(__name__)
@@ -50,21 +62,42 @@ async def async_setup_platform(
     """
     cmp_mgr_cfg = config
 
-    entities = []
-    # (Optional) Example sensors
-    sensors = cmp_mgr_cfg.get("sensors", [])
-    for s_conf in sensors:
-        # ToDo: injectiing show_debug_attributes is inelegant, find a better way
-        s_conf["show_debug_attributes"] = cmp_mgr_cfg.get("show_debug_attributes", False)
-        entities.append(ComplianceManagerSensor(s_conf))
+    entities = build_sensors(cmp_mgr_cfg)
 
     # pass the necessary info to services (snooze in particular, in services.py)
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN]["binary_sensor_instances"] = entities
 
+    # Capture mode: record the traffic reaching the sensors (see capture.py / replay.py)
+    # a reload keeps the running capture session if the file didn't change
+    capture_file = cmp_mgr_cfg.get("capture_file")
+    capture = hass.data[DOMAIN].get("capture")
+    if capture is not None and capture.path != capture_file:
+        hass.data[DOMAIN].pop("capture")
+        await capture.async_close()
+        capture = None
+    if capture_file and capture is None:
+        hass.data[DOMAIN]["capture"] = EventCapture(hass, capture_file)
+
     async_add_entities(entities)
 
 
+def build_sensors(cmp_mgr_cfg: ConfigType, sensor_cls: type | None = None) -> list:
+    """    Instantiates one sensor per entry of a validated platform config.
+    sensor_cls defaults to ComplianceManagerSensor (replay.py passes its own subclass).
+    """
+    sensor_cls = sensor_cls or ComplianceManagerSensor
+    entities = []
+    # (Optional) Example sensors
+    sensors = cmp_mgr_cfg.get("sensors", [])
+    for s_conf in sensors:
+        # ToDo: injectiing show_debug_attributes is inelegant, find a better way
+        s_conf["show_debug_attributes"] = cmp_mgr_cfg.get("show_debug_attributes", False)
+        s_conf["evaluation_slice"] = cmp_mgr_cfg.get("evaluation_slice", DEFAULT_EVALUATION_SLICE)
+        entities.append(sensor_cls(s_conf))
+    return entities
+
+
 ###############  ComplianceManagerSensor ###############
 class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
     """Compliance monitoring sensor."""
@@ -84,30 +117,48 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
         self._rules = s_conf.get("compliance", [])
         self._optimized_rules = [] #  performance-optimized version
         self._tracked_entities: set[str] = set()
+        self._max_age_watches: dict[str, set[timedelta]] = {}  # entity_id -> max_ages, see staleness.py
         self._snooze_registry: dict[str, RegistryEntry] = {}
+        self._snooze_index: dict[str, RegistryEntry] = {}  # tracked entity_id -> longest matching snooze
         self._violations_registry: dict[str, RegistryEntry] = {}
         self._write_count = 0
         self._config = s_conf
-        self._unsub_states = None
-
-    async def async_snooze(self, entities: list[str], duration: timedelta) -> None:
+        self._attr_extra_state_attributes = {}
+        self._eval_generation = 0  # bumped by every evaluation, lets sliced ones detect they are stale
+        self._eval_running = False    # an evaluation requested by _async_request_evaluation is running
+        self._eval_requested = False  # ... and another one was requested meanwhile
+        # (entity_id, rule_idx) keys of the last published evaluation (or restored), None until then
+        self._last_violations: dict[tuple[str, int], dict] | None = None
+        self._last_snoozed: set[tuple[str, int]] = set()
+        self._last_summary: dict | None = None
+        self._hysteresis_history: dict[tuple, bool] = {}  # see conditions.LeafNode
+        # (rule_idx, entity_id) -> (accepted compliance, time a different result was first seen)
+        self._dwell_state: dict[tuple[int, str], tuple[bool, datetime.datetime | None]] = {}
+        self._dwell_timer: RegistryEntry | None = None
+
+    async def async_snooze(self, entities: list[str], duration: timedelta,
+                           area_ids: list[str] | None = None, label_ids: list[str] | None = None) -> None:
         """        Applies a snooze period to specific sub-entities.
-        Calculates the expiry time and updates the snooze registry. If no
-        entities are specified, it automatically snoozes all currently
-        active violations for that sensor.
+        Calculates the expiry time and updates the snooze registry. Entity ids
+        containing wildcards (e.g. sensor.garage_*_battery), areas and labels
+        are stored as a single pattern entry with one timer, whatever the number
+        of entities they match. If nothing is specified, it automatically snoozes
+        all currently active violations for that sensor.
         """
         expiry = dt_util.now() + duration
 
         # If no entities provided, snooze all currently active violations
-        if not entities:
+        if not entities and not area_ids and not label_ids:
             entities = self._attr_extra_state_attributes.get("active_violations", [])
 
-        for eid in entities:
-            self._snooze_registry[eid] = self._create_timer(eid, expiry)
-
+        keys = [f"{SNOOZE_GLOB_PREFIX}{eid}" if _is_glob(eid) else eid for eid in entities]
+        keys += [f"{SNOOZE_AREA_PREFIX}{a_id}" for a_id in area_ids or []]
+        keys += [f"{SNOOZE_LABEL_PREFIX}{l_id}" for l_id in label_ids or []]
+        for key in keys:
+            self._snooze_registry[key] = self._create_timer(key, expiry)
+        self._rebuild_snooze_index()
 
-        await self._evaluate_compliance()
-        self.async_write_ha_state()
+        await self._async_request_evaluation()
 
     async def async_added_to_hass(self) -> None:
         """        Called when the sensor is added to Home Assistant.
@@ -127,6 +178,13 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
                     for eid, iso_str in _s.items()
                 }
 
+            if ATTRIBUTES.VIOLATIONS in last_state.attributes:
+                # baseline of the violation events, see _publish_deltas
+                self._last_violations = {
+                    (v["entity_id"], v["rule"]): v
+                    for v in last_state.attributes.get(ATTRIBUTES.VIOLATIONS) or []
+                }
+
             if ATTRIBUTES.VIOLATION_REGISTRY in last_state.attributes:
                 _d = last_state.attributes.get(ATTRIBUTES.VIOLATION_REGISTRY) or {}
                 self._violations_registry = {
@@ -136,67 +194,121 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
 
         self._attr_is_on = (last_state.state == "on") if last_state else False
 
-        async def _setup_monitoring(_event=None):
-            """        Initializes the monitoring engine for the sensor.
-              Flattens complex target rules into individual entity tracking,
-              sets up Jinga2 templates for conditions, and subscribes to
-              state change events for all relevant entities.
-              """
-            # cleanup before re-calculating
-            if self._unsub_states:
-                self._unsub_states()
-            self._tracked_entities.clear()
-            # 1. Flatten the rules once at startup
-            resolved_rules = []
-
-            _LOGGER.debug(f" {len(self._rules)} {self._rules=}")
-            for idx, rule in enumerate(self._rules):
-                # Resolve the target into a pure list of entity_ids
-                actual_eids = self._get_entities_from_target(rule["target"])
-                self._tracked_entities.update(actual_eids)
-
-                # Create a copy so we don't mess with the original config object
-                new_rule = rule.copy()
-                new_rule["_idx"] = idx
-                # REWRITE the target to be pure entity_ids only:
-                new_rule["target"] = {"entity_id": actual_eids }
-                condition_key = _get_condition_key(new_rule)
-                raw_cond =  new_rule[condition_key]
-                if condition_key == "value_template":
-                    self.cache_value_templates(raw_cond)
-
-                resolved_rules.append(new_rule)
-
-            # 2. Overwrite self._rules with the "flattened" version
-            self._optimized_rules = resolved_rules
-
-            # 3. Standard event setup
-            if self._tracked_entities:
-                self._unsub_states = async_track_state_change_event(
-                    self.hass,
-                    list(self._tracked_entities),
-                    self._update_event_handler
-                )
-                # This ensures clean removal if the sensor itself is deleted
-                self.async_on_remove(self._unsub_states)
-            await self._evaluate_compliance()
-            self.async_write_ha_state()
+        dispatcher = async_get_state_dispatcher(self.hass)
+        sweep = async_get_staleness_sweep(self.hass)
+        # This ensures clean removal if the sensor itself is deleted
+        self.async_on_remove(lambda: dispatcher.async_remove_sensor(self))
+        self.async_on_remove(lambda: sweep.async_remove_sensor(self))
 
         self.async_on_remove(
             self.hass.bus.async_listen(
                 EVENT_ENTITY_REGISTRY_UPDATED,
-                _setup_monitoring
+                self._async_setup_monitoring
             )
         )
 
         if self.hass.is_running:
-            await _setup_monitoring()
+            await self._async_setup_monitoring()
+        else:
+            self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, self._async_setup_monitoring)
+
+    async def _async_setup_monitoring(self, _event=None) -> None:
+        """        Initializes the monitoring engine for the sensor.
+          Flattens complex target rules into individual entity tracking,
+          sets up Jinga2 templates for conditions, and registers the
+          relevant entities with the integration-wide state dispatcher.
+          Also run by replay.py whenever the captured targets change.
+          """
+        # 1. + 2. Flatten the rules
+        self._resolve_rules()
+        if capture := self.hass.data.get(DOMAIN, {}).get("capture"):
+            capture.record_sensor(self._attr_unique_id, self._optimized_rules)
+
+        # 3. Route the state changes of the tracked entities to this sensor
+        async_get_state_dispatcher(self.hass).async_update_sensor(self, self._tracked_entities)
+        # and let the shared sweep re-trigger the max_age conditions
+        async_get_staleness_sweep(self.hass).async_update_sensor(self, self._max_age_watches)
+        if await self._evaluate_compliance(cooperative=True):
+            self.async_write_ha_state()
+
+    def _resolve_rules(self) -> None:
+        """    Flattens the configured rules into self._optimized_rules:
+        every target is resolved into a pure list of entity_ids (also
+        collected in self._tracked_entities) and the conditions are compiled
+        into a DAG shared by all the rules of the sensor (see conditions.py).
+        """
+        self._tracked_entities.clear()
+        self._max_age_watches = {}
+        resolved_rules = []
+        compiler = ConditionCompiler(self.hass, self._hysteresis_history)
+
+        _LOGGER.debug(f" {len(self._rules)} {self._rules=}")
+        for idx, rule in enumerate(self._rules):
+            # Resolve the target into a pure list of entity_ids
+            actual_eids = self._get_entities_from_target(rule["target"])
+            self._tracked_entities.update(actual_eids)
+
+            # Create a copy so we don't mess with the original config object
+            new_rule = rule.copy()
+            new_rule["_idx"] = idx
+            # REWRITE the target to be pure entity_ids only:
+            new_rule["target"] = {"entity_id": actual_eids }
+            new_rule["_condition"] = compiler.compile(new_rule)
+            if max_ages := {leaf.expected for leaf in iter_leaves(new_rule["_condition"]) if leaf.kind == "max_age"}:
+                for eid in actual_eids:
+                    self._max_age_watches.setdefault(eid, set()).update(max_ages)
+
+            resolved_rules.append(new_rule)
+
+        # Overwrite self._optimized_rules with the "flattened" version
+        self._optimized_rules = resolved_rules
+
+        # forget hysteresis/dwell history of entities that are no longer targeted
+        for key in [key for key in self._hysteresis_history if key[1] not in self._tracked_entities]:
+            del self._hysteresis_history[key]
+        targeted = {(rule["_idx"], eid) for rule in resolved_rules for eid in rule["target"]["entity_id"]}
+        self._dwell_state = {key: value for key, value in self._dwell_state.items() if key in targeted}
+
+        # the pattern snoozes match the tracked entities, which may have changed
+        self._rebuild_snooze_index()
+
+    def _rebuild_snooze_index(self) -> None:
+        """     Compiles the snooze registry (plain entity_ids and glob/area/label
+        patterns) into an entity_id -> entry index of the tracked entities,
+        so the evaluation checks a snooze with a single lookup per target.
+        """
+        index: dict[str, RegistryEntry] = {}
+        for key, entry in self._snooze_registry.items():
+            if entry.is_expired:
+                continue
+            for eid in self._resolve_snooze_key(key):
+                if eid not in index or index[eid].expiry < entry.expiry:
+                    index[eid] = entry
+        self._snooze_index = index
+
+    def _resolve_snooze_key(self, key: str) -> list[str]:
+        """Returns the entity_ids matched by a snooze_registry key."""
+        if key.startswith(SNOOZE_GLOB_PREFIX):
+            return fnmatch.filter(self._tracked_entities, key.removeprefix(SNOOZE_GLOB_PREFIX))
+        if key.startswith(SNOOZE_AREA_PREFIX):
+            target = {"area_id": key.removeprefix(SNOOZE_AREA_PREFIX)}
+        elif key.startswith(SNOOZE_LABEL_PREFIX):
+            target = {"label_id": key.removeprefix(SNOOZE_LABEL_PREFIX)}
         else:
-            self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _setup_monitoring)
+            return [key]
+        return [eid for eid in self._get_entities_from_target(target) if eid in self._tracked_entities]
 
     async def async_will_remove_from_hass(self) -> None:
         """        Performs cleanup before the sensor is removed. """
         await super().async_will_remove_from_hass()
+        if self._dwell_timer:
+            self._dwell_timer.cancel()
+        # let the websocket subscribers drop it (see websocket_api.py)
+        async_dispatcher_send(self.hass, SIGNAL_COMPLIANCE_DELTA, {"sensor": self.entity_id, "removed": True})
+
+    async def async_on_entities_changed(self, entity_ids: set[str]) -> None:
+        """Called by the state dispatcher once per batch of changes of the tracked entities."""
+        await self._update_event_handler(None)
 
     async def _update_event_handler(self, _event):
         """        Standard event handler for state changes.
@@ -204,22 +316,54 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
         a full re-evaluation of the compliance logic and a state
         update in the Home Assistant UI.
         """
-        await self._evaluate_compliance()
-        self.async_schedule_update_ha_state()
+        await self._async_request_evaluation()
 
-    async def _evaluate_compliance(self) -> None:
+    async def _async_request_evaluation(self) -> None:
+        """        Runs a sliced evaluation and writes the state if it was published.
+        Requests arriving while one is running (state changes, timers, snoozes)
+        don't supersede it: they are coalesced into a single new pass once it
+        is done, so a busy sensor still publishes after every pass.
+        """
+        if self._eval_running:
+            self._eval_requested = True
+            return
+        self._eval_running = True
+        try:
+            self._eval_requested = True
+            while self._eval_requested:
+                self._eval_requested = False
+                if await self._evaluate_compliance(cooperative=True):
+                    self.async_schedule_update_ha_state()
+        finally:
+            self._eval_running = False
+
+    async def _evaluate_compliance(self, cooperative: bool = False) -> bool:
         """   CORE LOGIC engine for determining sensor state.
         Iterates through rules, checks for active snoozes, evaluates
         violations against grace periods, and updates the final
         binary state and attributes (severity, violation list).
+        With cooperative=True the loop yields to the event loop every
+        'evaluation_slice'; new grace timers and the attributes are only
+        published at the end, and an evaluation superseded by a newer one
+        while yielding is dropped (only a rule re-resolution starts one
+        directly, the rest goes through _async_request_evaluation).
+        Returns True if the result was published.
         """
+        self._eval_generation += 1
+        generation = self._eval_generation
+        slice_budget = self._config.get("evaluation_slice", DEFAULT_EVALUATION_SLICE).total_seconds()
+        deadline = time.monotonic() + slice_budget
+
         mark_problem = False
         ignored_violations_count = 0
         active_violations = []
         max_severity = {"level": 9, "label": "SeverityEvaluationFail"}
-        self._write_count += 1
 
         all_grace_targets = set()
+        condition_memo: dict = {}  # results of the shared condition nodes, for this pass only
+        snoozed_violations: set[tuple[str, int]] = set()
+        new_grace_expiries: dict[str, datetime.datetime] = {}  # grace timers to create when publishing
+        now = dt_util.now()
 
         _LOGGER.debug(f"{self._optimized_rules=}")
         for rule in self._optimized_rules:  # can be replaced with self._rules
@@ -229,7 +373,17 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
                 allowed_violations_count = len(rule["target"]["entity_id"]) + allowed_violations_count
                 allowed_violations_count = max(0, allowed_violations_count)
             for rule_target in rule["target"]["entity_id"]:
-                if self._is_condition_compliant(rule, rule_target):
+                if cooperative and time.monotonic() >= deadline:
+                    await asyncio.sleep(0)
+                    if generation != self._eval_generation:
+                        _LOGGER.debug("%s: sliced evaluation superseded, dropping it", self._attr_name)
+                        return False
+                    deadline = time.monotonic() + slice_budget
+
+                compliant = self._is_condition_compliant(rule, rule_target, condition_memo)
+                if "min_dwell" in rule:
+                    compliant = self._apply_min_dwell(rule, rule_target, compliant, now)
+                if compliant:
                     continue
 
 
@@ -243,22 +397,28 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
 
                 all_grace_targets.add(grace_target)
 
-                if grace_target not in self._violations_registry:
-                    expiry = dt_util.now() + grace_delta
-                    _LOGGER.debug("Starting NEW grace period for %s. Expires at %s", grace_target, expiry)
-                    self._violations_registry[grace_target] = self._create_timer(grace_target, expiry)
+                if grace_target in self._violations_registry:
+                    grace_expired = self._violations_registry[grace_target].is_expired
+                else:
+                    if grace_target not in new_grace_expiries:
+                        new_grace_expiries[grace_target] = now + grace_delta
+                        _LOGGER.debug("Starting NEW grace period for %s. Expires at %s",
+                                      grace_target, new_grace_expiries[grace_target])
+                    grace_expired = new_grace_expiries[grace_target] <= now
 
-                if timer_snooze := self._snooze_registry.get(rule_target):
+                if timer_snooze := self._snooze_index.get(rule_target):
                     if not timer_snooze.is_expired:
                         _LOGGER.debug("Snooze active for %s, skipping", rule_target)
+                        if grace_expired:
+                            snoozed_violations.add((rule_target, rule["_idx"]))
                         continue  # if we are here, snooze active >> skip violation evaluation
 
-                timer_grace = self._violations_registry[grace_target]
-                if timer_grace.is_expired:
+                if grace_expired:
                     _LOGGER.debug("Grace EXPIRED for %s. Adding to active violations.", grace_target)
                     current_sev = self._get_severity_data(rule_sev_raw)
                     active_violations.append({
                         'entity_id': rule_target,
+                        'rule': rule['_idx'],
                         'severity': current_sev['level'],
                         'severity_label': current_sev['label']
                     })
@@ -273,15 +433,22 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
             if not mark_problem and local_violations <= allowed_violations_count:
                 ignored_violations_count += local_violations
 
+        # Publish: from here on nothing yields, so the swap is atomic for the event loop
+        self._write_count += 1
         active_violations_eids = [v["entity_id"] for v in active_violations]
 
+        for grace_target, expiry in new_grace_expiries.items():
+            self._violations_registry[grace_target] = self._create_timer(grace_target, expiry)
         for grace_target in list(self._violations_registry.keys()):
             if grace_target not in all_grace_targets:
                 # if we are here, grace expired >> pop will trigger RegistryEntry.__del__
                 self._violations_registry.pop(grace_target)
-        for snooze_target in list(self._snooze_registry.keys()):
-            if self._snooze_registry[snooze_target].is_expired:
-                self._snooze_registry.pop(snooze_target)
+        expired_snoozes = [key for key, entry in self._snooze_registry.items() if entry.is_expired]
+        for snooze_target in expired_snoozes:
+            self._snooze_registry.pop(snooze_target)
+        if expired_snoozes:
+            self._rebuild_snooze_index()
+        self._schedule_dwell_check()
 
         grace_period_display = list({str(rule["grace_period"]) for rule in self._rules if "grace_period" in rule})
         self._attr_is_on = mark_problem
@@ -296,6 +463,7 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
                 eid: entry.expiry_iso
                 for eid, entry in self._snooze_registry.items()
             },
+            ATTRIBUTES.VIOLATIONS: active_violations,
         }
         if self._config.get("show_debug_attributes", False):
             attrs.update({
@@ -309,79 +477,134 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
                 ATTRIBUTES.WRITE_OPS: self._write_count
             })
         self._attr_extra_state_attributes = attrs
+        self._publish_deltas(
+            {(v["entity_id"], v["rule"]): v for v in active_violations},
+            snoozed_violations)
+        return True
 
-    def cache_value_templates(self, condition: Any) -> None:
-        """    cache this so the value_template actually works
-                and you don't have to requery it every time
-        """
-        condition.hass = self.hass
+    def compliance_summary(self) -> dict:
+        """Sensor-level part of the websocket snapshot (state, severity, snoozes)."""
+        attrs = self._attr_extra_state_attributes or {}
+        return {
+            "is_on": bool(self._attr_is_on),
+            ATTRIBUTES.SEVERITY: attrs.get(ATTRIBUTES.SEVERITY, ""),
+            ATTRIBUTES.SEVERITY_LABEL: attrs.get(ATTRIBUTES.SEVERITY_LABEL, ""),
+            "snoozes": attrs.get(ATTRIBUTES.SNOOZE_REGISTRY, {}),
+        }
 
+    def compliance_snapshot(self) -> dict:
+        """Full websocket snapshot of this sensor (see websocket_api.py)."""
+        return {
+            "sensor": self.entity_id,
+            "name": self._attr_name,
+            **self.compliance_summary(),
+            "violations": list((self._last_violations or {}).values()),
+        }
 
-    def _is_condition_compliant(self, condition: dict, rule_target: str) -> bool:
-        """     Handles recursive logic (implicit AND for multiple entities or rules))
-             Performs an atomic evaluation of a specific condition.
-        Compares the target state or attribute against expected
-        numeric ranges, specific states, or rendered templates to
-        return a boolean violation result.
+    def _publish_deltas(self, violations: dict[tuple[str, int], dict],
+                        snoozed: set[tuple[str, int]]) -> None:
+        """    Fires started/cleared/snoozed bus events for the violations that
+        changed since the previous evaluation, so consumers don't need to
+        diff the active_violations attribute, and sends the same delta
+        (plus the sensor summary, if changed) to websocket subscribers.
+        The first evaluation after startup (or reload) compares with the
+        violations restored from the last state, fires no events if there's
+        none, and sends the full snapshot to the subscribers instead of a delta.
+        """
+        previous, previous_snoozed = self._last_violations, self._last_snoozed
+        self._last_violations, self._last_snoozed = violations, snoozed
+        summary, previous_summary = self.compliance_summary(), self._last_summary
+        self._last_summary = summary
+        if previous_summary is None:
+            async_dispatcher_send(self.hass, SIGNAL_COMPLIANCE_DELTA, self.compliance_snapshot())
+        if previous is None:
+            return
+
+        started = [violations[key] for key in violations.keys() - previous.keys()]
+        cleared, snoozed_now = [], []
+        for key in previous.keys() - violations.keys():
+            if key in snoozed and key not in previous_snoozed:
+                snoozed_now.append(previous[key])
+            else:
+                cleared.append(previous[key])
+
+        for violation in started:
+            self._fire_violation_event(EVENT_VIOLATION_STARTED, violation)
+        for violation in cleared:
+            self._fire_violation_event(EVENT_VIOLATION_CLEARED, violation)
+        for violation in snoozed_now:
+            self._fire_violation_event(EVENT_VIOLATION_SNOOZED, violation)
+
+        if previous_summary is None:
+            return  # the snapshot already told the subscribers
+        delta = {key: value for key, value in
+                 (("started", started), ("cleared", cleared), ("snoozed", snoozed_now)) if value}
+        if summary != previous_summary:
+            delta.update(summary)
+        if delta:
+            async_dispatcher_send(self.hass, SIGNAL_COMPLIANCE_DELTA, {"sensor": self.entity_id, **delta})
+
+    def _fire_violation_event(self, event_type: str, violation: dict) -> None:
+        """Fires a single violation delta event on the bus."""
+        self.hass.bus.async_fire(event_type, {
+            "sensor": self.entity_id,
+            "entity_id": violation["entity_id"],
+            "rule": violation["rule"],
+            "severity": violation["severity"],
+            "severity_label": violation["severity_label"],
+        })
+
+    def _is_condition_compliant(self, rule: dict, rule_target: str, memo: dict | None = None) -> bool:
+        """     Evaluates a resolved rule against one of its target entities.
+        Unavailable/unknown states are settled by the rule's allow_* flags,
+        everything else by the compiled condition DAG of the rule (nested
+        all/any/not blocks, numeric ranges, expected states and templates).
         """
-        # Handle lists (implicit AND)
-        if isinstance(condition, list):
-            _LOGGER.error("PODDD this is a list {condition=}")
-            return False
-
         state_obj = self.hass.states.get(rule_target)
         if state_obj is None:
             return False
 
         if state_obj.state == "unavailable":
-            return  condition.get("allow_unavailable", False)
+            return  rule.get("allow_unavailable", False)
         if state_obj.state == "unknown":
-            return  condition.get("allow_unknown", False)
-
-        # Resolve target value (Attribute vs State)
-        target_attr = condition.get("attribute")
-        val_to_check = state_obj.attributes.get(target_attr) if target_attr else state_obj.state
+            return  rule.get("allow_unknown", False)
 
-        # Handle case where attribute is missing
-        if target_attr and target_attr not in state_obj.attributes:
-            return False
-
-        # A. Value Template
-        if "value_template" in condition:
-            try:
-                res = condition["value_template"].async_render(
-                    variables={"t_state": val_to_check,
-                               "t_entity": state_obj,
-                               "t_id": state_obj.entity_id },
-                    parse_result=True
-                )
-                _LOGGER.debug(f"{condition["value_template"]=}: {res=}. {val_to_check=}, {state_obj.entity_id=}")
-                return  res
-            except Exception:
-                return False
-
-        # B. Expected Numeric
-        if "expected_number" in condition:
-            try:
-                val = float(val_to_check)
-                limits = condition["expected_number"]
-                if "min" in limits and val < limits["min"]:
-                    return False
-                if "max" in limits and val > limits["max"]:
-                    return False
-                return True
-            except (ValueError, TypeError):
-                return False
-
-        # C. Expected State
-        if "expected_state" in condition:
-            expected = condition["expected_state"]
-            if isinstance(expected, bool):
-                actual_bool = str(val_to_check).lower() in ON_EQUIVALENT_STATES
-                return actual_bool == expected
-            return str(val_to_check).lower() == str(expected).lower()
+        return rule["_condition"].evaluate(state_obj, memo if memo is not None else {})
 
-        return True
+    def _apply_min_dwell(self, rule: dict, rule_target: str, compliant: bool, now: datetime.datetime) -> bool:
+        """     Debounces the compliance of an entity for rules with 'min_dwell'.
+        A result different from the accepted one is only accepted once it
+        has been seen continuously for min_dwell; until then the accepted
+        one is returned. The first result of an entity is accepted as is.
+        """
+        key = (rule["_idx"], rule_target)
+        accepted, pending_since = self._dwell_state.get(key, (compliant, None))
+        if compliant == accepted:
+            self._dwell_state[key] = (accepted, None)
+            return accepted
+        if pending_since is None:
+            pending_since = now
+        if now - pending_since >= rule["min_dwell"]:
+            self._dwell_state[key] = (compliant, None)
+            return compliant
+        self._dwell_state[key] = (accepted, pending_since)
+        return accepted
+
+    def _schedule_dwell_check(self) -> None:
+        """     Keeps a single timer per sensor at the end of the first pending
+        min_dwell, so flapping entities don't each get their own timer.
+        """
+        min_dwells = {rule["_idx"]: rule["min_dwell"] for rule in self._optimized_rules if "min_dwell" in rule}
+        next_check = min((since + min_dwells[idx]
+                          for (idx, _eid), (_accepted, since) in self._dwell_state.items()
+                          if since is not None and idx in min_dwells), default=None)
+        if self._dwell_timer and self._dwell_timer.expiry == next_check:
+            return
+        if self._dwell_timer:
+            self._dwell_timer.cancel()
+            self._dwell_timer = None
+        if next_check is not None:
+            self._dwell_timer = self._create_timer(f"{self._attr_name}___min_dwell", next_check)
 
     def _get_severity_data(self, sev_cfg):
         """        Helper to normalize severity configuration data.
@@ -399,8 +622,11 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
         area IDs, or labels, and queries the registry to provide a
         comprehensive list of tracked entities.
         """
-        ent_reg = er.async_get(self.hass)
         entities = set(cv.ensure_list(target.get("entity_id", [])))
+        if not target.get("area_id") and not target.get("label_id"):
+            return list(entities)  # plain entity_ids, no need for the registry
+
+        ent_reg = er.async_get(self.hass)
         if area_ids := target.get("area_id"):
             for a_id in cv.ensure_list(area_ids):
                 entities.update(e.entity_id for e in er.async_entries_for_area(ent_reg, a_id))
@@ -427,16 +653,6 @@ class ComplianceManagerSensor(RestoreEntity, BinarySensorEntity):
             self._update_event_handler )
 
 
-def _get_condition_key(rule: dict) -> str | None:
-    """Returns the atomic key if it's an atomic rule, else  None."""
-    for key in CONDITION_KEYS:
-        if key in rule:
-            return key
-    return None
-
-def _get_condition(rule: dict) -> str | None:
-    """Returns the atomic key if it's an atomic rule, else  None."""
-    for key in CONDITION_KEYS:
-        if key in rule:
-            return rule[key]
-    return None
+def _is_glob(entity_id: str) -> bool:
+    """True if a snoozed entity_id is a wildcard pattern."""
+    return any(char in entity_id for char in "*?[")
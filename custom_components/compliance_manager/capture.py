@@ -0,0 +1,131 @@
+"""Capture mode: records the traffic reaching the compliance sensors.
+
+    Enabled with 'capture_file' on the binary_sensor platform. The file is a
+    gzipped stream of compact json lines, replayed offline by replay.py:
+
+        {"v": 1, "start": "<iso>"}                          header, once per HA run
+        {"sensor": "<unique_id>", "rules": {"0": [eids]}}   resolved rule targets
+        [t, "entity_id", "state" | null, {attributes}]      state, t = seconds since start
+        [t, "entity_id"]                                    same state reported again (max_age entities)
+
+    A sensor's rules line is only written when its resolved targets changed
+    (entity registry updates re-resolve every sensor, mostly to the same targets),
+    preceded by the current state of the targets the session didn't record yet,
+    so the replay has every state the sensor reads when it gets the rules.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_FORMAT_VERSION = 1
+FLUSH_EVERY_LINES = 500
+FLUSH_INTERVAL = timedelta(seconds=30)  # so a quiet capture still reaches the file
+
+
+class EventCapture:
+    """Buffers captured lines and appends them to the capture file in the executor."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """    Opens a new capture session (a new header line, appended to
+        any existing content), flushes the buffer periodically and on shutdown.
+        """
+        self.hass = hass
+        self.path = path
+        self._start = dt_util.utcnow()
+        self._buffer: list[str] = []
+        self._flush_lock = asyncio.Lock()
+        self._sensor_rules: dict[str, dict] = {}  # unique_id -> last recorded rules
+        self._recorded: set[str] = set()          # entity_ids with a state line in this session
+        self._append({"v": CAPTURE_FORMAT_VERSION, "start": self._start.isoformat()})
+        self._unsub_stop = hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_on_stop)
+        self._unsub_interval = async_track_time_interval(hass, self._async_on_interval, FLUSH_INTERVAL)
+
+    @callback
+    def record_sensor(self, unique_id: str, resolved_rules: list[dict]) -> None:
+        """Records the resolved targets of a sensor if they changed, after the states not recorded yet."""
+        rules = {str(rule["_idx"]): rule["target"]["entity_id"] for rule in resolved_rules}
+        if self._sensor_rules.get(unique_id) == rules:
+            return
+        self._sensor_rules[unique_id] = rules
+        now = dt_util.utcnow()
+        for eid in sorted({eid for eids in rules.values() for eid in eids} - self._recorded):
+            self._append_state(eid, self.hass.states.get(eid), now)
+        self._append({"sensor": unique_id, "rules": rules})
+
+    @callback
+    def record_event(self, event: Event) -> None:
+        """Records a state_changed event (called once per event by the state dispatcher)."""
+        self._append_state(event.data["entity_id"], event.data.get("new_state"), event.time_fired)
+
+    @callback
+    def record_report(self, event: Event) -> None:
+        """Records a state_reported event (called by the staleness sweep for the entities it watches)."""
+        t = round((event.data["new_state"].last_reported - self._start).total_seconds(), 3)
+        self._append([t, event.data["entity_id"]])
+
+    def _append_state(self, entity_id: str, state: State | None, when) -> None:
+        """Appends a state line; a removed entity is recorded as null."""
+        self._recorded.add(entity_id)
+        t = round((when - self._start).total_seconds(), 3)
+        if state is None:
+            self._append([t, entity_id, None, {}])
+        else:
+            self._append([t, entity_id, state.state, dict(state.attributes)])
+
+    def _append(self, line) -> None:
+        """Buffers one line and schedules a flush once the buffer is big enough."""
+        self._buffer.append(json.dumps(line, separators=(",", ":"), default=str))
+        if len(self._buffer) >= FLUSH_EVERY_LINES:
+            self.hass.async_create_task(self.async_flush())
+
+    async def async_flush(self) -> None:
+        """Writes the buffered lines; the lock keeps the flushes in order."""
+        async with self._flush_lock:
+            lines, self._buffer = self._buffer, []
+            if lines:
+                await self.hass.async_add_executor_job(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        """Appends a new gzip member to the file (runs in the executor)."""
+        try:
+            with gzip.open(self.path, "at", encoding="utf-8") as capture_file:
+                capture_file.write("\n".join(lines) + "\n")
+        except OSError as err:
+            _LOGGER.error("Cannot write compliance capture file %s: %s", self.path, err)
+
+    async def async_close(self) -> None:
+        """Ends the session: stops the periodic flush and writes what is left in the buffer."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        if self._unsub_interval is not None:
+            self._unsub_interval()
+            self._unsub_interval = None
+        await self.async_flush()
+
+    async def _async_on_interval(self, _now: datetime) -> None:
+        await self.async_flush()
+
+    async def _async_on_stop(self, _event) -> None:
+        """Flushes what is left in the buffer when Home Assistant stops."""
+        self._unsub_stop = None  # a fired listen_once listener is already gone
+        await self.async_close()
+
+
+def read_capture(path: str):
+    """Yields the decoded lines of a capture file (gzip members are read back to back)."""
+    with gzip.open(path, "rt", encoding="utf-8") as capture_file:
+        for line in capture_file:
+            if line.strip():
+                yield json.loads(line)
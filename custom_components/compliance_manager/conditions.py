@@ -0,0 +1,216 @@
+"""Compiles compliance conditions into a short-circuiting DAG.
+
+    A condition is either a leaf (expected_state, expected_number, value_template, max_age)
+    or a logic block (all: [...], any: [...], not: {...}) nesting more conditions.
+    ConditionCompiler turns them into ConditionNode objects, once per rule
+    resolution (see ComplianceManagerSensor._resolve_rules):
+        * the children of all/any are sorted cheapest first, so templates are
+          only rendered when the simple checks didn't already decide the result
+        * identical subexpressions (within and across the rules of a sensor) are
+          compiled into the same node, shared nodes cache their result per entity
+          for the duration of one evaluation pass
+        * expected_number leaves with a 'hysteresis' remember their last result
+          per entity in a dict owned by the sensor, which survives recompiling
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.util import dt as dt_util
+
+from .const import CONDITION_KEYS, ON_EQUIVALENT_STATES
+from .staleness import last_seen
+
+_LOGGER = logging.getLogger(__name__)
+
+# Relative cost of the leaves, used to evaluate cheap checks first
+LEAF_COSTS = {"expected_state": 1, "max_age": 1, "expected_number": 2, "value_template": 100}
+
+
+class ConditionNode(ABC):
+    """Base node: evaluate() answers 'is this entity state compliant?'."""
+
+    key: tuple = ()
+    cost: int = 0
+
+    def __init__(self) -> None:
+        self.shared = False  # set by the compiler when the node is used more than once
+
+    def evaluate(self, state_obj: State, memo: dict) -> bool:
+        """Evaluates the node, going through the per-pass memo when the node is shared."""
+        if not self.shared:
+            return self._evaluate(state_obj, memo)
+        memo_key = (id(self), state_obj.entity_id)
+        if memo_key not in memo:
+            memo[memo_key] = self._evaluate(state_obj, memo)
+        return memo[memo_key]
+
+    @abstractmethod
+    def _evaluate(self, state_obj: State, memo: dict) -> bool:
+        """Computes the result of the node, without the memo lookup."""
+
+
+class LeafNode(ConditionNode):
+    """Atomic check of the state (or an attribute) of the target entity."""
+
+    def __init__(self, kind: str, expected: Any, attribute: str | None, history: dict) -> None:
+        super().__init__()
+        self.kind = kind
+        self.expected = expected
+        self.attribute = attribute
+        self.history = history
+        self.cost = LEAF_COSTS[kind]
+        if kind == "value_template":
+            self.key = (kind, expected.template, attribute)
+        elif kind == "expected_number":
+            self.key = (kind, tuple(sorted(expected.items())), attribute)
+        else:
+            self.key = (kind, expected, attribute)
+
+    def _evaluate(self, state_obj: State, memo: dict) -> bool:
+        # Max Age: about the entity, not its value; re-checked by the staleness sweep
+        if self.kind == "max_age":
+            # stale from the deadline on, like the sweep sees it
+            return dt_util.utcnow() - last_seen(state_obj) < self.expected
+
+        # Resolve target value (Attribute vs State)
+        if self.attribute:
+            # Handle case where attribute is missing
+            if self.attribute not in state_obj.attributes:
+                return False
+            val_to_check = state_obj.attributes[self.attribute]
+        else:
+            val_to_check = state_obj.state
+
+        # A. Value Template
+        if self.kind == "value_template":
+            try:
+                res = self.expected.async_render(
+                    variables={"t_state": val_to_check,
+                               "t_entity": state_obj,
+                               "t_id": state_obj.entity_id },
+                    parse_result=True
+                )
+                _LOGGER.debug(f"{self.expected=}: {res=}. {val_to_check=}, {state_obj.entity_id=}")
+                return bool(res)
+            except Exception:
+                return False
+
+        # B. Expected Numeric
+        if self.kind == "expected_number":
+            if "hysteresis" not in self.expected:
+                return self._in_range(val_to_check, 0)
+            # min/max are the thresholds to enter a violation, to leave it the
+            # value has to get back 'hysteresis' past them
+            history_key = (self.key, state_obj.entity_id)
+            was_compliant = self.history.get(history_key, True)
+            compliant = self._in_range(val_to_check, 0 if was_compliant else self.expected["hysteresis"])
+            self.history[history_key] = compliant
+            return compliant
+
+        # C. Expected State
+        if isinstance(self.expected, bool):
+            actual_bool = str(val_to_check).lower() in ON_EQUIVALENT_STATES
+            return actual_bool == self.expected
+        return str(val_to_check).lower() == str(self.expected).lower()
+
+
+    def _in_range(self, val_to_check: Any, margin: float) -> bool:
+        """Numeric check, with the min/max bounds tightened by margin."""
+        try:
+            val = float(val_to_check)
+        except (ValueError, TypeError):
+            return False
+        if "min" in self.expected and val < self.expected["min"] + margin:
+            return False
+        if "max" in self.expected and val > self.expected["max"] - margin:
+            return False
+        return True
+
+
+class AllNode(ConditionNode):
+    """Compliant if every child is, stops at the first non compliant one."""
+
+    def __init__(self, children: list[ConditionNode]) -> None:
+        super().__init__()
+        self.children = sorted(children, key=lambda node: node.cost)
+        self.cost = sum(node.cost for node in self.children)
+        self.key = ("all", tuple(node.key for node in self.children))
+
+    def _evaluate(self, state_obj: State, memo: dict) -> bool:
+        return all(node.evaluate(state_obj, memo) for node in self.children)
+
+
+class AnyNode(AllNode):
+    """Compliant if at least one child is, stops at the first compliant one."""
+
+    def __init__(self, children: list[ConditionNode]) -> None:
+        super().__init__(children)
+        self.key = ("any", self.key[1])
+
+    def _evaluate(self, state_obj: State, memo: dict) -> bool:
+        return any(node.evaluate(state_obj, memo) for node in self.children)
+
+
+class NotNode(ConditionNode):
+    """Inverts its child."""
+
+    def __init__(self, child: ConditionNode) -> None:
+        super().__init__()
+        self.child = child
+        self.cost = child.cost
+        self.key = ("not", child.key)
+
+    def _evaluate(self, state_obj: State, memo: dict) -> bool:
+        return not self.child.evaluate(state_obj, memo)
+
+
+class ConditionCompiler:
+    """Compiles condition dicts into nodes, reusing identical subexpressions."""
+
+    def __init__(self, hass: HomeAssistant, history: dict) -> None:
+        self.hass = hass
+        self.history = history  # last results of the hysteresis leaves, kept by the sensor
+        self._nodes: dict[tuple, ConditionNode] = {}
+
+    def compile(self, condition: dict, attribute: str | None = None) -> ConditionNode:
+        """    Compiles a rule or a nested condition block. The 'attribute' of a
+        block applies to the leaves below it unless they set their own.
+        """
+        attribute = condition.get("attribute", attribute)
+        if "all" in condition:
+            node = AllNode([self.compile(sub, attribute) for sub in condition["all"]])
+        elif "any" in condition:
+            node = AnyNode([self.compile(sub, attribute) for sub in condition["any"]])
+        elif "not" in condition:
+            node = NotNode(self.compile(condition["not"], attribute))
+        else:
+            kind = next(key for key in CONDITION_KEYS if key in condition)
+            if kind == "value_template":
+                # cache this so the value_template actually works
+                # and you don't have to requery it every time
+                condition[kind].hass = self.hass
+            node = LeafNode(kind, condition[kind], attribute, self.history)
+        return self._intern(node)
+
+    def _intern(self, node: ConditionNode) -> ConditionNode:
+        """Returns the already compiled twin of a node, if any, and marks it as shared."""
+        if existing := self._nodes.get(node.key):
+            existing.shared = True
+            return existing
+        self._nodes[node.key] = node
+        return node
+
+
+def iter_leaves(node: ConditionNode):
+    """Yields the leaves below a node (shared leaves once per path)."""
+    if isinstance(node, LeafNode):
+        yield node
+    elif isinstance(node, NotNode):
+        yield from iter_leaves(node.child)
+    else:
+        for child in node.children:
+            yield from iter_leaves(child)
@@ -7,7 +7,19 @@ LAB_PREFIX = "compliance_manager_lab_tester_"
 DOMAIN = "compliance_manager"  # Change this to your actual folder name
 PLATFORMS = ["binary_sensor", "switch"]
 ON_EQUIVALENT_STATES = [ "on", "true", "home", "open", "connected", "1", "yes", "problem", "unsafe", "detected", "active" ]
-CONDITION_KEYS = ["expected_state", "expected_number", "value_template"]
+CONDITION_KEYS = ["expected_state", "expected_number", "value_template", "max_age"]
+LOGIC_KEYS = ["all", "any", "not"]  # nested condition blocks, see conditions.py
+# snooze_registry keys of the pattern snoozes, any other key is a plain entity_id
+SNOOZE_GLOB_PREFIX = "glob:"
+SNOOZE_AREA_PREFIX = "area:"
+SNOOZE_LABEL_PREFIX = "label:"
+
+# Bus events fired on violation deltas between two consecutive evaluations
+EVENT_VIOLATION_STARTED = f"{DOMAIN}_violation_started"
+EVENT_VIOLATION_CLEARED = f"{DOMAIN}_violation_cleared"
+EVENT_VIOLATION_SNOOZED = f"{DOMAIN}_violation_snoozed"
+# Dispatcher signal carrying the per-sensor deltas to websocket subscribers
+SIGNAL_COMPLIANCE_DELTA = f"{DOMAIN}_compliance_delta"
 
 class ComplianceManagerAttributes:
     """Constants for ComplianceManager Attributes."""
@@ -19,6 +31,7 @@ class ComplianceManagerAttributes:
     ACTIVE_COUNT = "active_count"
     ALLOWED_VIOLATIONS = "ignored_violations"
     SNOOZE_REGISTRY = "snooze_registry"
+    VIOLATIONS = "violations"  # restored as the baseline of the violation events
 
     # Debug/Detailed Attributes
     VIOLATION_REGISTRY = "violations_registry"  # Replaces failing_reg
@@ -36,4 +49,8 @@ SEVERITY_LEVELS = {
 }
 DEFAULT_SEVERITY = "problem"
 DEFAULT_ICON = "mdi:shield-check"
-DEFAULT_GRACE = timedelta(seconds=0)
\ No newline at end of file
+DEFAULT_GRACE = timedelta(seconds=0)
+# Max time a full evaluation may hold the event loop before yielding
+DEFAULT_EVALUATION_SLICE = timedelta(milliseconds=20)
+# Period of the shared sweep re-checking the max_age (staleness) conditions
+STALENESS_SWEEP_INTERVAL = timedelta(seconds=60)
@@ -0,0 +1,373 @@
+"""Offline replay of a capture file (see capture.py) through the compliance engine.
+
+    python -m custom_components.compliance_manager.replay <sensors.yaml> <capture.jsonl.gz> [--speed N]
+
+    The sensors are built from the compliance_manager entries under 'binary_sensor:'
+    in the YAML file (e.g. lab/compliance_manager_lab_sensors.yaml), validated with
+    BINSENS_PLATFORM_SCHEMA, and run against a stub hass (templates render against
+    it too: states() & co. work, helpers needing a real hass do not). Sensors are
+    matched to the capture by unique_id, area/label targets use the resolution
+    that was captured. Websocket deltas are counted, not sent.
+    Time is virtual: dt_util.now() and the grace/snooze timers follow the captured
+    timestamps, so grace periods behave as they did live at any replay speed.
+    The captured lines go through the live code paths: the sensors are set up by
+    _async_setup_monitoring (again whenever their captured targets change), state
+    lines reach them through a real StateDispatcher and the max_age conditions
+    run through a real StalenessSweep ticking on the virtual clock. Lines with the
+    same timestamp are delivered in one event loop iteration, so the dispatcher
+    batches them as it would live.
+    --speed 0 (default) replays as fast as possible, 1 in real time, 10 ten times faster.
+
+    The report lists, per sensor, the evaluations and their timing, the final
+    state and the number of state/violation transitions; --outcomes dumps the
+    transitions as json, so two runs of the engine can be diffed for correctness.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable
+from unittest.mock import patch
+
+from homeassistant import core
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import Event, State
+from homeassistant.util import dt as dt_util
+from homeassistant.util.yaml import load_yaml
+
+from . import binary_sensor, staleness, state_dispatcher, timers
+from .binary_sensor import ComplianceManagerSensor, build_sensors
+from .capture import read_capture
+from .const import DOMAIN, ComplianceManagerAttributes as ATTRIBUTES
+from .schema import BINSENS_PLATFORM_SCHEMA
+
+
+class VirtualClock:
+    """Replay time source, replaces dt_util.now(), async_track_point_in_time and async_track_time_interval."""
+
+    def __init__(self) -> None:
+        self.now: datetime = dt_util.utc_from_timestamp(0)  # moved to the session start by the header
+        self._timers: list[list] = []
+        self._seq = itertools.count()
+
+    def time_now(self, *_args, **_kwargs) -> datetime:
+        """Stand-in for dt_util.now() / dt_util.utcnow()."""
+        return self.now
+
+    def track_point_in_time(self, _hass, action: Callable, point: datetime) -> Callable:
+        """Stand-in for async_track_point_in_time, returns the unsub callable."""
+        return self._track(action, point, None)
+
+    def track_time_interval(self, _hass, action: Callable, interval: timedelta, **_kwargs) -> Callable:
+        """Stand-in for async_track_time_interval, returns the unsub callable."""
+        return self._track(action, self.now + interval, interval)
+
+    def _track(self, action: Callable, point: datetime, interval: timedelta | None) -> Callable:
+        handle = [action]  # shared by the entries of a repeating timer
+        heapq.heappush(self._timers, [point, next(self._seq), handle, interval])
+
+        def unsub() -> None:
+            handle[0] = None
+        return unsub
+
+    async def advance_to(self, when: datetime) -> None:
+        """Moves the clock forward, firing the timers that fall due on the way."""
+        while self._timers and self._timers[0][0] <= when:
+            point, _seq, handle, interval = heapq.heappop(self._timers)
+            if handle[0] is None:
+                continue
+            self.now = max(self.now, point)
+            if interval is not None:
+                heapq.heappush(self._timers, [point + interval, next(self._seq), handle, interval])
+            result = handle[0](self.now)
+            if asyncio.iscoroutine(result):
+                await result
+        self.now = max(self.now, when)
+
+
+class StubStates:
+    """Minimal state machine holding real State objects."""
+
+    def __init__(self) -> None:
+        self._states: dict[str, State] = {}
+
+    def get(self, entity_id: str) -> State | None:
+        return self._states.get(entity_id)
+
+    def async_all(self, domain_filter=None) -> list[State]:
+        return list(self._states.values())
+
+    def async_entity_ids(self, domain_filter=None) -> list[str]:
+        return list(self._states)
+
+    def set(self, entity_id: str, state: str | None, attributes: dict, when: datetime) -> None:
+        """Sets (or removes, if state is None) a state, keeping last_changed like HA does."""
+        if state is None:
+            self._states.pop(entity_id, None)
+            return
+        old = self._states.get(entity_id)
+        last_changed = old.last_changed if old and old.state == state else when
+        self._states[entity_id] = State(
+            entity_id, state, attributes, last_changed=last_changed, last_updated=when)
+
+    def report(self, entity_id: str, when: datetime) -> None:
+        """Same state written again: only last_reported moves."""
+        if (old := self._states.get(entity_id)) is not None:
+            self._states[entity_id] = State(
+                entity_id, old.state, old.attributes, last_changed=old.last_changed,
+                last_reported=when, last_updated=old.last_updated)
+
+
+class StubTracker:
+    """Stand-in for async_track_state_change_event / async_track_state_report_event, fired by the replay."""
+
+    def __init__(self, event_type: str) -> None:
+        self.event_type = event_type
+        self._actions: dict[str, list[Callable]] = defaultdict(list)
+
+    def track(self, _hass, entity_ids: str | list[str], action: Callable, *_args, **_kwargs) -> Callable:
+        entity_ids = [entity_ids] if isinstance(entity_ids, str) else list(entity_ids)
+        for eid in entity_ids:
+            self._actions[eid].append(action)
+
+        def unsub() -> None:
+            for eid in entity_ids:
+                self._actions[eid].remove(action)
+        return unsub
+
+    def fire(self, entity_id: str, data: dict, when: datetime) -> None:
+        """Calls the actions tracking the entity, like the event helpers do."""
+        if actions := self._actions.get(entity_id):
+            event = Event(self.event_type, {"entity_id": entity_id, **data}, time_fired_timestamp=when.timestamp())
+            for action in list(actions):
+                action(event)
+
+
+class StubBus:
+    """Counts the fired events, listeners are never called."""
+
+    def __init__(self) -> None:
+        self.fired: Counter = Counter()
+
+    def async_fire(self, event_type: str, event_data: dict | None = None, *_args, **_kwargs) -> None:
+        self.fired[event_type] += 1
+
+    def async_listen(self, *_args, **_kwargs) -> Callable:
+        return lambda: None
+
+    def async_listen_once(self, *_args, **_kwargs) -> Callable:
+        return lambda: None
+
+
+class StubHass:
+    """The parts of HomeAssistant the sensors use, created in the running event loop."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.states = StubStates()
+        self.bus = StubBus()
+        self.state_changes = StubTracker(EVENT_STATE_CHANGED)
+        self.state_reports = StubTracker(EVENT_STATE_REPORTED)
+        self.data: dict[str, Any] = {DOMAIN: {}}
+        self.is_running = True
+        # what the template engine reads from the config
+        self.config = SimpleNamespace(legacy_templates=False, debug=False)
+        self.deltas_sent = 0
+        self._tasks: list = []
+
+    def async_create_task(self, coro, *_args, **_kwargs) -> None:
+        """Queues the coroutine, run by async_drain() in order."""
+        self._tasks.append(coro)
+
+    async def async_settle(self) -> None:
+        """    Lets the pending call_soon callbacks run (e.g. the dispatcher flush),
+        then the coroutines they queued (the sensors they notify), in order.
+        """
+        await asyncio.sleep(0)
+        while self._tasks:
+            await self._tasks.pop(0)
+            await asyncio.sleep(0)
+
+    def dispatcher_send(self, _hass, _signal: str, *_args) -> None:
+        """Stand-in for async_dispatcher_send (websocket deltas), only counted."""
+        self.deltas_sent += 1
+
+
+class ReplaySensor(ComplianceManagerSensor):
+    """ComplianceManagerSensor that records timing and outcomes instead of writing states."""
+
+    def __init__(self, s_conf: dict) -> None:
+        super().__init__(s_conf)
+        self.clock: VirtualClock | None = None
+        self.eval_times: list[float] = []
+        self.outcomes: list[tuple[str, bool, list[str]]] = []
+
+    async def _evaluate_compliance(self, cooperative: bool = False) -> bool:
+        start = time.perf_counter()
+        published = await super()._evaluate_compliance(cooperative)
+        self.eval_times.append(time.perf_counter() - start)
+        return published
+
+    def async_write_ha_state(self) -> None:
+        self._record_outcome()
+
+    def async_schedule_update_ha_state(self, force_refresh: bool = False) -> None:
+        self._record_outcome()
+
+    def _record_outcome(self) -> None:
+        """Keeps the (time, state, active violations) transitions only."""
+        outcome = (bool(self._attr_is_on),
+                   sorted(self._attr_extra_state_attributes.get(ATTRIBUTES.ACTIVE_VIOLATIONS, [])))
+        if not self.outcomes or self.outcomes[-1][1:] != outcome:
+            self.outcomes.append((self.clock.now.isoformat(), *outcome))
+
+
+def load_sensors(config_path: str, hass: StubHass) -> list[ReplaySensor]:
+    """    Builds ReplaySensors from the compliance_manager binary_sensor entries of a YAML file.
+    cv.template binds the templates to the running hass, here the stub.
+    """
+    config = load_yaml(config_path) or {}
+    p_configs = config.get("binary_sensor", [])
+    if isinstance(p_configs, dict):
+        p_configs = [p_configs]
+
+    sensors = []
+    with patch.object(core._hass, "hass", hass):
+        for p_conf in p_configs:
+            if p_conf.get("platform") == DOMAIN:
+                sensors.extend(build_sensors(BINSENS_PLATFORM_SCHEMA(p_conf), ReplaySensor))
+    return sensors
+
+
+async def async_replay(config_path: str, capture_path: str, speed: float = 0) -> dict:
+    """Feeds the captured stream to the sensors and returns the report."""
+    hass = StubHass()
+    clock = VirtualClock()
+    sensors = {}
+    for sensor in load_sensors(config_path, hass):
+        sensor.hass = hass
+        sensor.clock = clock
+        sensor.entity_id = f"binary_sensor.{sensor.unique_id}"
+        sensors[sensor.unique_id] = sensor
+    hass.data[DOMAIN]["binary_sensor_instances"] = list(sensors.values())
+
+    session_start = clock.now
+    state_lines = 0
+    skipped = set()
+    wall_start = time.perf_counter()
+
+    with patch.object(dt_util, "now", clock.time_now), \
+            patch.object(dt_util, "utcnow", clock.time_now), \
+            patch.object(timers, "async_track_point_in_time", clock.track_point_in_time), \
+            patch.object(binary_sensor, "async_dispatcher_send", hass.dispatcher_send), \
+            patch.object(staleness, "async_track_time_interval", clock.track_time_interval), \
+            patch.object(staleness, "async_track_state_report_event", hass.state_reports.track), \
+            patch.object(state_dispatcher, "async_track_state_change_event", hass.state_changes.track):
+        for line in read_capture(capture_path):
+            if isinstance(line, dict) and "v" in line:
+                await hass.async_settle()
+                session_start = dt_util.parse_datetime(line["start"])
+                await clock.advance_to(session_start)
+                continue
+
+            if isinstance(line, dict) and "sensor" in line:
+                sensor = sensors.get(line["sensor"])
+                if sensor is None:
+                    skipped.add(line["sensor"])
+                    continue
+                captured = line["rules"]
+                sensor._rules = [
+                    {**rule, "target": {"entity_id": captured.get(str(idx), [])}}
+                    for idx, rule in enumerate(sensor._config.get("compliance", []))
+                ]
+                # the states it reads were captured before its rules line
+                await sensor._async_setup_monitoring()
+                continue
+
+            when = session_start + timedelta(seconds=line[0])
+            if when > clock.now:
+                # a new loop iteration: deliver the batch of the previous timestamp
+                await hass.async_settle()
+                if speed > 0:
+                    await asyncio.sleep((when - clock.now).total_seconds() / speed)
+                await clock.advance_to(when)
+                await hass.async_settle()
+
+            entity_id = line[1]
+            old_state = hass.states.get(entity_id)
+            if len(line) == 2:
+                # state_reported: only matters to the max_age conditions
+                hass.states.report(entity_id, when)
+                if (new_state := hass.states.get(entity_id)) is not None:
+                    hass.state_reports.fire(entity_id, {
+                        "old_last_reported": old_state.last_reported,
+                        "last_reported": new_state.last_reported, "new_state": new_state}, when)
+                continue
+
+            hass.states.set(entity_id, line[2], line[3], when)
+            state_lines += 1
+            hass.state_changes.fire(
+                entity_id, {"old_state": old_state, "new_state": hass.states.get(entity_id)}, when)
+        await hass.async_settle()
+
+    wall_time = time.perf_counter() - wall_start
+    return {
+        "state_lines": state_lines,
+        "wall_time": wall_time,
+        "events_fired": dict(hass.bus.fired),
+        "deltas_sent": hass.deltas_sent,
+        "unmatched_sensors": sorted(skipped),
+        "sensors": {
+            uid: {
+                "evaluations": len(sensor.eval_times),
+                "total_ms": sum(sensor.eval_times) * 1000,
+                "mean_ms": sum(sensor.eval_times) * 1000 / len(sensor.eval_times) if sensor.eval_times else 0,
+                "max_ms": max(sensor.eval_times, default=0) * 1000,
+                "is_on": bool(sensor.is_on),
+                "active_violations": sensor._attr_extra_state_attributes.get(ATTRIBUTES.ACTIVE_VIOLATIONS, []),
+                "transitions": sensor.outcomes,
+            }
+            for uid, sensor in sensors.items()
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    """Prints the human readable summary of a replay."""
+    print(f"{report['state_lines']} state lines replayed in {report['wall_time']:.3f}s")
+    print(f"{'sensor':40} {'evals':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'state':>5} {'viol':>5} {'trans':>6}")
+    for uid, res in report["sensors"].items():
+        print(f"{uid:40} {res['evaluations']:>7} {res['total_ms']:>10.2f} {res['mean_ms']:>9.3f} "
+              f"{res['max_ms']:>9.3f} {'on' if res['is_on'] else 'off':>5} "
+              f"{len(res['active_violations']):>5} {len(res['transitions']):>6}")
+    for event_type, count in sorted(report["events_fired"].items()):
+        print(f"{event_type}: {count}")
+    print(f"websocket deltas: {report['deltas_sent']}")
+    if report["unmatched_sensors"]:
+        print(f"captured sensors missing from the config: {', '.join(report['unmatched_sensors'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a compliance_manager capture file.")
+    parser.add_argument("config", help="YAML file with the compliance_manager binary_sensor entries")
+    parser.add_argument("capture", help="capture file written by 'capture_file'")
+    parser.add_argument("--speed", type=float, default=0, help="0 = as fast as possible, 1 = real time")
+    parser.add_argument("--outcomes", help="write the per-sensor transitions to this json file")
+    args = parser.parse_args()
+
+    report = asyncio.run(async_replay(args.config, args.capture, args.speed))
+    print_report(report)
+    if args.outcomes:
+        with open(args.outcomes, "w", encoding="utf-8") as outcomes_file:
+            json.dump({uid: res["transitions"] for uid, res in report["sensors"].items()}, outcomes_file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,54 @@
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 from datetime import timedelta
-from .const import SEVERITY_LEVELS, DEFAULT_SEVERITY
+from .const import SEVERITY_LEVELS, DEFAULT_SEVERITY, DEFAULT_EVALUATION_SLICE, CONDITION_KEYS, LOGIC_KEYS
+
+EXPECTED_STATE_SCHEMA = vol.Any(cv.string, vol.Coerce(float), bool)
+
+
+def hysteresis_fits_range(value: dict) -> dict:
+    """With both bounds, the band tightened by the hysteresis on each side must not be empty."""
+    if "hysteresis" in value and "min" in value and "max" in value:
+        if 2 * value["hysteresis"] >= value["max"] - value["min"]:
+            raise vol.Invalid(
+                f"hysteresis ({value['hysteresis']}) must be less than half of max - min "
+                f"({value['max']} - {value['min']}), or a violation could (almost) never clear")
+    return value
+
+
+EXPECTED_NUMBER_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Optional("min"): vol.Coerce(float),
+        vol.Optional("max"): vol.Coerce(float),
+        # a violation entered at min/max only clears 'hysteresis' past them
+        vol.Optional("hysteresis"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }), cv.has_at_least_one_key("min", "max"), hysteresis_fits_range
+)
+
+
+def nested_condition(value):
+    """Validates a condition inside an all/any/not block (recursive)."""
+    return NESTED_CONDITION_SCHEMA(value)
+
+
+# the condition keys, shared by the rules and the nested blocks
+CONDITION_FIELDS = {
+    vol.Optional("attribute"): cv.string,
+    vol.Optional("expected_state"): EXPECTED_STATE_SCHEMA,
+    vol.Optional("expected_number"): EXPECTED_NUMBER_SCHEMA,
+    vol.Optional("value_template"): cv.template,
+    # not reported for longer than this >> non compliant (see staleness.py)
+    vol.Optional("max_age"): cv.time_period,
+    vol.Optional("all"): vol.All(cv.ensure_list, vol.Length(min=1), [nested_condition]),
+    vol.Optional("any"): vol.All(cv.ensure_list, vol.Length(min=1), [nested_condition]),
+    vol.Optional("not"): nested_condition,
+}
+
+NESTED_CONDITION_SCHEMA = vol.All(
+    vol.Schema({vol.Optional("alias"): cv.string, **CONDITION_FIELDS}),
+    cv.has_at_least_one_key(*CONDITION_KEYS, *LOGIC_KEYS),
+    cv.has_at_most_one_key(*CONDITION_KEYS, *LOGIC_KEYS),
+)
 
 
 BINSENS_PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
@@ -17,21 +64,14 @@ BINSENS_PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
                 {
                     vol.Required("target"): cv.TARGET_SERVICE_FIELDS,
                     vol.Optional("alias"): cv.string,
-                    vol.Optional("alias"): cv.string,
-                    vol.Optional("attribute"): cv.string,
-                    vol.Optional("expected_state"): vol.Any(cv.string, vol.Coerce(float), bool),
-                    vol.Optional("expected_number"): vol.All(
-                        vol.Schema({
-                            vol.Optional("min"): vol.Coerce(float),
-                            vol.Optional("max"): vol.Coerce(float),
-                        }), cv.has_at_least_one_key("min", "max")
-                    ),
-                    vol.Optional("value_template"): cv.template,
+                    **CONDITION_FIELDS,
                     vol.Optional("allowed_violations_count", default=0): vol.Coerce(int),
                     vol.Optional("allow_unavailable", default=False): cv.boolean,
                     vol.Optional("allow_unknown", default=False): cv.boolean,
                     vol.Optional("grace_period", default=timedelta(seconds=0)): cv.time_period,
                     vol.Optional("group_grace", default=False): cv.boolean,
+                    # a change of compliance of an entity must persist this long to be accepted
+                    vol.Optional("min_dwell"): cv.time_period,
                     vol.Optional("severity", default=DEFAULT_SEVERITY): vol.Any(
                         vol.All(cv.string, vol.Lower, vol.In(SEVERITY_LEVELS.keys())),  # Accepts strings like "critical" or number
                         vol.All(
@@ -42,12 +82,16 @@ BINSENS_PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
                         )
                     )
                 },
-                        cv.has_at_least_one_key("expected_state", "expected_number", "value_template"),
-                        cv.has_at_most_one_key("expected_state", "expected_number", "value_template")
+                        cv.has_at_least_one_key(*CONDITION_KEYS, *LOGIC_KEYS),
+                        cv.has_at_most_one_key(*CONDITION_KEYS, *LOGIC_KEYS)
             )]
         ),
     }]),
     vol.Optional("show_debug_attributes", default=False): cv.boolean,
+    # time budget of each slice of a full (startup/reload/snooze) evaluation
+    vol.Optional("evaluation_slice", default=DEFAULT_EVALUATION_SLICE): cv.time_period,
+    # record the state_changed traffic reaching the sensors to this file (gzipped json lines, see replay.py)
+    vol.Optional("capture_file"): cv.string,
 })
 
 SWITCH_PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
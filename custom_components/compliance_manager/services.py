@@ -18,13 +18,15 @@ async def async_register_services(hass: HomeAssistant):
         target_ids = call.data.get("entity_id", [])
         sub_entities = call.data.get("sub_entities", [])
         duration = call.data.get("duration")
+        area_ids = call.data.get("area_id", [])
+        label_ids = call.data.get("label_id", [])
 
         #  Recover saved instances from  hass.data
         entities = hass.data.get(DOMAIN, {}).get("binary_sensor_instances", [])
 
         for entity in entities:
             if entity.entity_id in target_ids:
-                await entity.async_snooze(sub_entities, duration)
+                await entity.async_snooze(sub_entities, duration, area_ids, label_ids)
 
     async def handle_cleanup_test_lab(call: ServiceCall):
         """ Cleanup test lab entities all switches, typically 3 x 40 = 120 entities ."""
@@ -42,7 +44,9 @@ async def async_register_services(hass: HomeAssistant):
         DOMAIN, "snooze", handle_snooze,
         schema=vol.Schema({
             vol.Required("entity_id"): cv.entity_ids,
-            vol.Optional("sub_entities"): cv.ensure_list,
+            vol.Optional("sub_entities"): cv.ensure_list,  # entity_ids, wildcards allowed
+            vol.Optional("area_id"): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional("label_id"): vol.All(cv.ensure_list, [cv.string]),
             vol.Required("duration"): cv.time_period,
         })
     )
@@ -0,0 +1,174 @@
+"""Integration-wide sweep for the max_age (staleness) conditions.
+
+    A max_age condition turns non compliant when its entity hasn't reported
+    for a while, i.e. without any state change to trigger an evaluation.
+    Sensors register here the (entity_id, max_age) pairs of their rules; the
+    sweep keeps them in a heap ordered by deadline (last seen + max_age) and,
+    every STALENESS_SWEEP_INTERVAL, only pops the ones whose deadline passed:
+        * entities that reported in the meantime are pushed back with their
+          new deadline
+        * the others are stale: their sensors are re-evaluated (once per tick)
+          and the entity is kept aside until it reports again
+    There's at most one heap entry per pair. Entities come back in the heap
+    when they report: the state dispatcher touches them on state_changed, the
+    sweep listens to state_reported (same state written again) of the watched
+    entities itself, and re-evaluates the sensors of the ones that were stale.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import logging
+from typing import Callable
+
+from homeassistant.core import Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_report_event, async_track_time_interval
+
+from .const import DOMAIN, STALENESS_SWEEP_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def last_seen(state_obj: State) -> datetime:
+    """Last time the entity reported, even without changing."""
+    return state_obj.last_reported
+
+
+@callback
+def async_get_staleness_sweep(hass: HomeAssistant) -> StalenessSweep:
+    """Returns the staleness sweep of the integration, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "staleness_sweep" not in domain_data:
+        domain_data["staleness_sweep"] = StalenessSweep(hass)
+    return domain_data["staleness_sweep"]
+
+
+class StalenessSweep:
+    """Periodic check of the max_age deadlines of all the sensors."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._watches: dict[tuple[str, timedelta], set] = {}        # (entity_id, max_age) -> sensors
+        self._sensor_watches: dict[object, set[tuple[str, timedelta]]] = {}
+        self._entity_max_ages: dict[str, set[timedelta]] = {}        # entity_id -> watched max_ages
+        self._heap: list[tuple[datetime, int, str, timedelta]] = []
+        self._scheduled: dict[tuple[str, timedelta], datetime] = {}  # pairs that have a heap entry
+        self._stale: set[tuple[str, timedelta]] = set()
+        self._seq = itertools.count()
+        self._unsub_interval: Callable | None = None
+        self._unsub_reported: dict[str, Callable] = {}  # entity_id -> state_reported subscription
+
+    @callback
+    def async_update_sensor(self, sensor, watches: dict[str, set[timedelta]]) -> None:
+        """(Re)registers the entity_id -> max_ages watched by a sensor."""
+        new_pairs = {(eid, max_age) for eid, max_ages in watches.items() for max_age in max_ages}
+        old_pairs = self._sensor_watches.get(sensor, set())
+        for pair in old_pairs - new_pairs:
+            self._remove_watch(pair, sensor)
+        for pair in new_pairs - old_pairs:
+            self._watches.setdefault(pair, set()).add(sensor)
+            self._entity_max_ages.setdefault(pair[0], set()).add(pair[1])
+            self._schedule(pair)
+        if new_pairs:
+            self._sensor_watches[sensor] = new_pairs
+        else:
+            self._sensor_watches.pop(sensor, None)
+        self._update_tracking()
+
+    @callback
+    def async_remove_sensor(self, sensor) -> None:
+        """Forgets a sensor that is being removed from Home Assistant."""
+        for pair in self._sensor_watches.pop(sensor, set()):
+            self._remove_watch(pair, sensor)
+        self._update_tracking()
+
+    @callback
+    def async_touch(self, entity_id: str, reported: bool = False) -> None:
+        """    Called when the entity reports: makes sure its deadlines are in the heap.
+        A state change re-evaluates the sensors anyway (state dispatcher), a
+        state_reported ('reported') one re-evaluates those for which it was stale.
+        """
+        changed: set = set()
+        for max_age in self._entity_max_ages.get(entity_id, ()):
+            pair = (entity_id, max_age)
+            if pair in self._stale:
+                self._stale.discard(pair)
+                changed.update(self._watches[pair])
+            self._schedule(pair)
+        if reported:
+            for sensor in changed:
+                self.hass.async_create_task(sensor.async_on_entities_changed({entity_id}))
+
+    @callback
+    def _async_on_state_reported(self, event: Event) -> None:
+        """The same state was written again: the entity is alive."""
+        self.async_touch(event.data["entity_id"], reported=True)
+        if capture := self.hass.data.get(DOMAIN, {}).get("capture"):
+            capture.record_report(event)
+
+    def _remove_watch(self, pair: tuple[str, timedelta], sensor) -> None:
+        sensors = self._watches.get(pair)
+        if sensors is not None:
+            sensors.discard(sensor)
+            if not sensors:
+                del self._watches[pair]
+                self._stale.discard(pair)
+                max_ages = self._entity_max_ages[pair[0]]
+                max_ages.discard(pair[1])
+                if not max_ages:
+                    del self._entity_max_ages[pair[0]]
+
+    def _schedule(self, pair: tuple[str, timedelta]) -> None:
+        """Pushes the deadline of a pair, unless an earlier entry already covers it (checked when popped)."""
+        state_obj = self.hass.states.get(pair[0])
+        if state_obj is None:
+            return
+        deadline = last_seen(state_obj) + pair[1]
+        if pair in self._scheduled and self._scheduled[pair] <= deadline:
+            return
+        self._scheduled[pair] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), *pair))
+
+    def _update_tracking(self) -> None:
+        """    Runs the periodic sweep only while something is watched and
+        listens to the state_reported events of the watched entities.
+        """
+        if self._watches and self._unsub_interval is None:
+            self._unsub_interval = async_track_time_interval(self.hass, self._async_sweep, STALENESS_SWEEP_INTERVAL)
+        elif not self._watches and self._unsub_interval is not None:
+            self._unsub_interval()
+            self._unsub_interval = None
+
+        for eid in self._unsub_reported.keys() - self._entity_max_ages.keys():
+            self._unsub_reported.pop(eid)()
+        for eid in self._entity_max_ages.keys() - self._unsub_reported.keys():
+            self._unsub_reported[eid] = async_track_state_report_event(self.hass, eid, self._async_on_state_reported)
+
+    @callback
+    def _async_sweep(self, now: datetime) -> None:
+        """Examines the pairs whose deadline passed and notifies the sensors of the stale ones."""
+        changed: dict[object, set[str]] = {}
+
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _seq, eid, max_age = heapq.heappop(self._heap)
+            pair = (eid, max_age)
+            if self._scheduled.get(pair) != deadline:
+                continue  # outdated entry
+            del self._scheduled[pair]
+            if pair not in self._watches:
+                continue
+            state_obj = self.hass.states.get(eid)
+            if state_obj is None:
+                continue
+            if last_seen(state_obj) + max_age > now:
+                self._schedule(pair)  # reported in the meantime
+                continue
+            self._stale.add(pair)
+            for sensor in self._watches[pair]:
+                changed.setdefault(sensor, set()).add(eid)
+
+        if changed:
+            _LOGGER.debug("Staleness sweep: %s sensors to re-evaluate", len(changed))
+        for sensor, entity_ids in changed.items():
+            self.hass.async_create_task(sensor.async_on_entities_changed(entity_ids))
@@ -0,0 +1,113 @@
+"""Integration-wide state_changed dispatcher.
+
+    Instead of every ComplianceManagerSensor subscribing to its own tracked
+    entities, the sensors register them here. The dispatcher keeps one
+    subscription per distinct entity and an entity -> sensors routing table;
+    state changes arriving in the same event loop iteration are batched, so
+    each interested sensor is re-evaluated once per batch.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_get_state_dispatcher(hass: HomeAssistant) -> StateDispatcher:
+    """Returns the dispatcher of the integration, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "state_dispatcher" not in domain_data:
+        domain_data["state_dispatcher"] = StateDispatcher(hass)
+    return domain_data["state_dispatcher"]
+
+
+class StateDispatcher:
+    """Routes state changes of the tracked entities to the interested sensors."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._routes: dict[str, set] = {}            # entity_id -> sensors
+        self._sensor_entities: dict[object, set[str]] = {}  # sensor -> entity_ids
+        self._unsubs: dict[str, Callable] = {}       # entity_id -> state subscription
+        self._pending: dict[object, set[str]] = {}   # sensor -> changed entity_ids
+        self._cleanup_scheduled = False
+        self._flush_scheduled = False
+
+    @callback
+    def async_update_sensor(self, sensor, entity_ids: set[str]) -> None:
+        """    (Re)registers the entities tracked by a sensor. New entities are
+        subscribed right away, before the sensor reads their states. Dropped
+        ones are unsubscribed once per loop iteration, so a registry update that
+        makes every sensor re-resolve its targets doesn't churn shared entities.
+        """
+        old_ids = self._sensor_entities.get(sensor, set())
+        new_ids = set(entity_ids)
+        for eid in old_ids - new_ids:
+            self._remove_route(eid, sensor)
+        added = 0
+        for eid in new_ids - old_ids:
+            self._routes.setdefault(eid, set()).add(sensor)
+            if eid not in self._unsubs:
+                self._unsubs[eid] = async_track_state_change_event(self.hass, eid, self._async_on_state_changed)
+                added += 1
+        self._sensor_entities[sensor] = new_ids
+        if old_ids - new_ids:
+            self._schedule_cleanup()
+        if added:
+            _LOGGER.debug("State dispatcher tracks %s entities (%s new)", len(self._unsubs), added)
+
+    @callback
+    def async_remove_sensor(self, sensor) -> None:
+        """Forgets a sensor that is being removed from Home Assistant."""
+        for eid in self._sensor_entities.pop(sensor, set()):
+            self._remove_route(eid, sensor)
+        self._pending.pop(sensor, None)
+        self._schedule_cleanup()
+
+    def _remove_route(self, eid: str, sensor) -> None:
+        sensors = self._routes.get(eid)
+        if sensors is not None:
+            sensors.discard(sensor)
+            if not sensors:
+                del self._routes[eid]
+
+    def _schedule_cleanup(self) -> None:
+        if not self._cleanup_scheduled:
+            self._cleanup_scheduled = True
+            self.hass.loop.call_soon(self._cleanup)
+
+    @callback
+    def _cleanup(self) -> None:
+        """Drops the subscriptions of the entities no sensor routes anymore."""
+        self._cleanup_scheduled = False
+        for eid in self._unsubs.keys() - self._routes.keys():
+            self._unsubs.pop(eid)()
+
+    @callback
+    def _async_on_state_changed(self, event: Event) -> None:
+        """Queues the sensors interested in the changed entity."""
+        if capture := self.hass.data.get(DOMAIN, {}).get("capture"):
+            capture.record_event(event)
+        eid = event.data["entity_id"]
+        if sweep := self.hass.data.get(DOMAIN, {}).get("staleness_sweep"):
+            sweep.async_touch(eid)
+        for sensor in self._routes.get(eid, ()):
+            self._pending.setdefault(sensor, set()).add(eid)
+        if self._pending and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.hass.loop.call_soon(self._flush)
+
+    @callback
+    def _flush(self) -> None:
+        """Notifies each queued sensor once for the whole batch of changes."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        for sensor, entity_ids in pending.items():
+            self.hass.async_create_task(sensor.async_on_entities_changed(entity_ids))
@@ -0,0 +1,60 @@
+"""Websocket API for Compliance Manager dashboards.
+
+    compliance_manager/list       returns a snapshot of every compliance sensor
+    compliance_manager/subscribe  pushes that snapshot first, then only the per-sensor deltas
+"""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_COMPLIANCE_DELTA
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Registers the websocket commands of this integration."""
+    websocket_api.async_register_command(hass, ws_list)
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/list"})
+@callback
+def ws_list(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict) -> None:
+    """    Returns violations, severity and snoozes of all compliance sensors,
+    so a frontend can render the fleet without reading their attributes.
+    """
+    connection.send_result(msg["id"], _async_fleet_snapshot(hass))
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/subscribe"})
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict) -> None:
+    """    Subscribes to the compliance sensors. The first event is the same
+    {"sensors": [...]} snapshot as compliance_manager/list, sent right after
+    the subscription is registered so no delta falls in between. Then:
+        * deltas sent by a sensor after an evaluation: {"sensor", "started",
+          "cleared", "snoozed"} (only the non-empty lists) plus "is_on",
+          "severity", "severity_label", "snoozes" when those changed
+        * the full snapshot of a sensor evaluated for the first time (startup,
+          reload), recognizable by the "violations" key: it replaces what is known
+        * {"sensor", "removed": true} when a sensor is removed (e.g. by a reload)
+    """
+    @callback
+    def forward_delta(delta: dict) -> None:
+        connection.send_message(websocket_api.event_message(msg["id"], delta))
+
+    connection.subscriptions[msg["id"]] = async_dispatcher_connect(
+        hass, SIGNAL_COMPLIANCE_DELTA, forward_delta)
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], _async_fleet_snapshot(hass)))
+
+
+@callback
+def _async_fleet_snapshot(hass: HomeAssistant) -> dict:
+    """Snapshots of the compliance sensors currently added to Home Assistant."""
+    entities = hass.data.get(DOMAIN, {}).get("binary_sensor_instances", [])
+    return {"sensors": [entity.compliance_snapshot() for entity in entities if entity.hass is not None]}